@@ -0,0 +1,76 @@
+# agg_trade_reader.py
+
+import os
+from typing import Iterator, List
+import numpy as np
+import pandas as pd
+
+# Column order of Binance aggTrades files (data.binance.vision)
+AGG_TRADE_COLUMNS = [
+    'agg_trade_id', 'price', 'quantity', 'first_trade_id',
+    'last_trade_id', 'transact_time', 'is_buyer_maker'
+]
+
+class AggTradeReader:
+    """
+    This class is responsible for streaming Binance aggTrades files chunk by chunk.
+    Only one chunk is held in memory at a time, so files with tens of millions of rows can be processed
+    with bounded memory.
+    """
+    def __init__(self, chunksize: int = 1_000_000, strict: bool = True):
+        """
+        :param chunksize: Number of aggregated trades read per chunk.
+        :param strict: Raise on a missing or unreadable file. When False, the error is printed and the
+                       rest of that file is skipped, which leaves a gap in the trade stream.
+        """
+        self.chunksize = chunksize
+        self.strict = strict
+
+    def iter_chunks(self, file_paths: List[str]) -> Iterator[pd.DataFrame]:
+        """
+        Reads aggTrades files (.csv or .zip) in order and yields them as DataFrame chunks.
+
+        Each chunk has 'price', 'quantity' (float64), 'transact_time' (int64, milliseconds)
+        and 'is_buyer_maker' (bool) columns. Files must be passed in chronological order.
+        """
+        for file_path in file_paths:
+            if not os.path.exists(file_path):
+                if self.strict:
+                    raise FileNotFoundError(f"找不到 aggTrades 檔案 '{file_path}'。")
+                print(f"錯誤：找不到 aggTrades 檔案 '{file_path}'，略過。")
+                continue
+
+            print(f"正在讀取 aggTrades 檔案 '{file_path}'...")
+            try:
+                reader = pd.read_csv(
+                    file_path,
+                    header=0 if self._has_header(file_path) else None,
+                    names=AGG_TRADE_COLUMNS,
+                    usecols=['price', 'quantity', 'transact_time', 'is_buyer_maker'],
+                    dtype={'price': np.float64, 'quantity': np.float64, 'transact_time': np.int64},
+                    chunksize=self.chunksize,
+                )
+                for chunk in reader:
+                    yield self._normalize_chunk(chunk)
+            except Exception as e:
+                # A partially read file would silently merge trades across the gap, so fail by default
+                if self.strict:
+                    raise ValueError(f"讀取 aggTrades 檔案 '{file_path}' 時發生錯誤: {e}") from e
+                print(f"讀取 aggTrades 檔案 '{file_path}' 時發生錯誤，略過此檔案剩餘的部分: {e}")
+
+    @staticmethod
+    def _has_header(file_path: str) -> bool:
+        """Futures files ship with a header row while older spot files do not."""
+        first_row = pd.read_csv(file_path, header=None, nrows=1)
+        return not str(first_row.iloc[0, 0]).strip().isdigit()
+
+    @staticmethod
+    def _normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+        """Normalizes timestamps to milliseconds and is_buyer_maker to bool."""
+        # Spot files from 2025 onwards record timestamps in microseconds
+        if len(chunk) and chunk['transact_time'].iloc[0] > 10**14:
+            chunk['transact_time'] = chunk['transact_time'] // 1000
+
+        if chunk['is_buyer_maker'].dtype != bool:
+            chunk['is_buyer_maker'] = chunk['is_buyer_maker'].astype(str).str.lower() == 'true'
+        return chunk
@@ -0,0 +1,238 @@
+# bar_builder.py
+
+from abc import ABC, abstractmethod
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+from agg_trade_reader import AggTradeReader
+from data_saver import DataSaver, NpzDataSaver
+import config
+
+# Output columns, matching DataProcessor.process_klines_to_dataframe so savers and loaders work unchanged
+BAR_COLUMNS = [
+    'Open time', 'Open', 'High', 'Low', 'Close', 'Volume',
+    'Quote asset volume', 'Number of trades', 'Taker buy base asset volume'
+]
+
+class BarBuilder(ABC):
+    """
+    Abstract base class for building information-driven bars (tick, volume, dollar) from aggregated trades.
+
+    Trades are streamed in chunk by chunk. A bar closes on the trade at which the cumulative measure
+    (trade count, base volume or quote volume) crosses the next multiple of the threshold. Each chunk is
+    aggregated with vectorized NumPy reductions; only the trades of the still-open bar are carried over
+    between chunks, so memory stays bounded by the chunk size plus one bar.
+    """
+    def __init__(self, threshold: float):
+        """
+        :param threshold: Amount of the measure each bar should contain.
+        """
+        if threshold <= 0:
+            raise ValueError("threshold must be positive.")
+        self.threshold = threshold
+        # Absolute running total of the measure over all trades seen so far. The cumulative sum is
+        # extended from this value rather than from a remainder, so it performs the same additions
+        # in the same order however the trades are chunked.
+        self._total = 0.0
+        # Trades of the currently open bar, or None if no bar is open
+        self._pending: Optional[dict] = None
+
+    @abstractmethod
+    def _measure(self, price: np.ndarray, quantity: np.ndarray) -> np.ndarray:
+        """Returns the per-trade contribution to the bar threshold."""
+        pass
+
+    def update(self, trades: pd.DataFrame) -> pd.DataFrame:
+        """
+        Consumes one chunk of trades and returns the bars completed by it.
+
+        :param trades: A chunk from AggTradeReader.iter_chunks.
+        :return: A DataFrame with BAR_COLUMNS, possibly empty.
+        """
+        if trades.empty:
+            return self._to_dataframe([])
+
+        columns = {
+            'price': trades['price'].to_numpy(dtype=np.float64),
+            'quantity': trades['quantity'].to_numpy(dtype=np.float64),
+            'time': trades['transact_time'].to_numpy(dtype=np.int64),
+            'is_buyer_maker': trades['is_buyer_maker'].to_numpy(dtype=bool),
+        }
+
+        # Absolute bar index of each trade, taken from the cumulative measure before the trade
+        measure = self._measure(columns['price'], columns['quantity'])
+        cumulative = np.cumsum(np.concatenate(([self._total], measure)))
+        bar_ids = np.floor(cumulative[:-1] / self.threshold).astype(np.int64)
+        self._total = cumulative[-1]
+
+        # The bar left open by the previous chunk continues with the first trade of this chunk. Its trades
+        # are prepended rather than its aggregate merged, so every bar is reduced over exactly the same
+        # values however the trades are chunked.
+        if self._pending is not None:
+            num_pending = len(self._pending['price'])
+            columns = {key: np.concatenate((self._pending[key], values)) for key, values in columns.items()}
+            bar_ids = np.concatenate((np.full(num_pending, bar_ids[0]), bar_ids))
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bar_ids)) + 1))
+        last_complete = np.floor(self._total / self.threshold) > bar_ids[-1]
+        if last_complete:
+            self._pending = None
+            complete_end = len(bar_ids)
+        else:
+            complete_end = starts[-1]
+            self._pending = {key: values[complete_end:] for key, values in columns.items()}
+            starts = starts[:-1]
+
+        return self._to_dataframe(self._aggregate(columns, starts, complete_end))
+
+    def flush(self) -> pd.DataFrame:
+        """
+        Returns the still-open bar (if any) as a final, partial bar and resets the builder.
+        """
+        if self._pending is None:
+            return self._to_dataframe([])
+        pending = self._pending
+        self._pending = None
+        self._total = 0.0
+        return self._to_dataframe(self._aggregate(pending, np.array([0]), len(pending['price'])))
+
+    @staticmethod
+    def _aggregate(columns: dict, starts: np.ndarray, end: int) -> dict:
+        """Aggregates the trades in [starts[i], starts[i + 1]) into bars, the last bar ending at `end`."""
+        if not len(starts):
+            return []
+        price = columns['price'][:end]
+        quantity = columns['quantity'][:end]
+        taker_buy = np.where(columns['is_buyer_maker'][:end], 0.0, quantity)
+        ends = np.append(starts[1:], end)
+        return {
+            'open_time': columns['time'][starts],
+            'open': price[starts],
+            'high': np.maximum.reduceat(price, starts),
+            'low': np.minimum.reduceat(price, starts),
+            'close': price[ends - 1],
+            'volume': np.add.reduceat(quantity, starts),
+            'quote_volume': np.add.reduceat(price * quantity, starts),
+            'num_trades': ends - starts,
+            'taker_buy_volume': np.add.reduceat(taker_buy, starts),
+        }
+
+    @staticmethod
+    def _to_dataframe(bars) -> pd.DataFrame:
+        """Converts bar arrays to the kline DataFrame layout used by DataProcessor."""
+        if not len(bars) or not len(bars['open_time']):
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        return pd.DataFrame({
+            'Open time': pd.to_datetime(bars['open_time'], unit='ms'),
+            'Open': bars['open'],
+            'High': bars['high'],
+            'Low': bars['low'],
+            'Close': bars['close'],
+            'Volume': bars['volume'],
+            'Quote asset volume': bars['quote_volume'],
+            'Number of trades': bars['num_trades'],
+            'Taker buy base asset volume': bars['taker_buy_volume'],
+        })
+
+class TickBarBuilder(BarBuilder):
+    """Closes a bar every `threshold` aggregated trades."""
+    def _measure(self, price: np.ndarray, quantity: np.ndarray) -> np.ndarray:
+        return np.ones_like(price)
+
+class VolumeBarBuilder(BarBuilder):
+    """Closes a bar every `threshold` units of base asset volume."""
+    def _measure(self, price: np.ndarray, quantity: np.ndarray) -> np.ndarray:
+        return quantity
+
+class DollarBarBuilder(BarBuilder):
+    """Closes a bar every `threshold` units of quote asset (e.g. USDT) volume."""
+    def _measure(self, price: np.ndarray, quantity: np.ndarray) -> np.ndarray:
+        return price * quantity
+
+BAR_BUILDERS = {
+    'tick': TickBarBuilder,
+    'volume': VolumeBarBuilder,
+    'dollar': DollarBarBuilder,
+}
+
+def build_bars_from_aggtrades(file_paths: List[str], bar_type: str, threshold: float, output_path: str,
+                              reader: AggTradeReader = None, saver: DataSaver = None,
+                              include_partial: bool = False) -> pd.DataFrame:
+    """
+    Streams aggTrades files through a bar builder and saves the bars in the kline file format,
+    so DataLoader, the strategies and the Backtester can use them unchanged.
+
+    :param file_paths: aggTrades files in chronological order.
+    :param bar_type: One of 'tick', 'volume' or 'dollar'.
+    :param threshold: Amount of the measure each bar should contain.
+    :param output_path: Destination file for the saver.
+    :param reader: AggTradeReader to use; defaults to one with the default chunk size.
+    :param saver: DataSaver to use; defaults to NpzDataSaver, compact if config.COMPACT_STORAGE is set.
+    :param include_partial: Whether to keep the last, incomplete bar.
+    :return: The bars as a DataFrame.
+    """
+    if bar_type not in BAR_BUILDERS:
+        raise ValueError(f"Unknown bar type '{bar_type}', expected one of {list(BAR_BUILDERS)}.")
+
+    builder = BAR_BUILDERS[bar_type](threshold)
+    reader = reader or AggTradeReader()
+    saver = saver or NpzDataSaver(compact=config.COMPACT_STORAGE)
+
+    print(f"開始建立 {bar_type} bars (門檻: {threshold})...")
+    bar_frames = []
+    num_trades = 0
+    for chunk in reader.iter_chunks(file_paths):
+        num_trades += len(chunk)
+        bar_frames.append(builder.update(chunk))
+    if include_partial:
+        bar_frames.append(builder.flush())
+
+    bar_frames = [frame for frame in bar_frames if not frame.empty]
+    if not bar_frames:
+        print("沒有產生任何 bar。")
+        return pd.DataFrame(columns=BAR_COLUMNS)
+
+    bars = pd.concat(bar_frames, ignore_index=True)
+    print(f"共處理 {num_trades} 筆成交，產生 {len(bars)} 根 bar。")
+    saver.save(bars, output_path)
+    return bars
+
+def check_chunk_invariance(trades: pd.DataFrame, bar_type: str, threshold: float,
+                           chunksizes: tuple = (777, 5_000, 1_000_000)) -> pd.DataFrame:
+    """
+    Builds bars from the same trades split into chunks of different sizes and checks that every
+    chunking produces identical bars, including the trailing partial bar.
+
+    :param trades: Trades in the AggTradeReader.iter_chunks layout.
+    :param bar_type: One of 'tick', 'volume' or 'dollar'.
+    :param threshold: Amount of the measure each bar should contain.
+    :param chunksizes: Chunk sizes to compare.
+    :return: The bars built with the first chunk size.
+    """
+    reference = None
+    for chunksize in chunksizes:
+        builder = BAR_BUILDERS[bar_type](threshold)
+        frames = [builder.update(trades.iloc[start:start + chunksize])
+                  for start in range(0, len(trades), chunksize)]
+        frames.append(builder.flush())
+        bars = pd.concat([frame for frame in frames if not frame.empty], ignore_index=True)
+        if reference is None:
+            reference = bars
+        elif not reference.equals(bars):
+            raise ValueError(f"{bar_type} bars built with chunk size {chunksize} differ from "
+                             f"those built with chunk size {chunksizes[0]}.")
+    return reference
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    num_trades = 20_000
+    sample = pd.DataFrame({
+        'price': np.round(30_000 + np.cumsum(rng.normal(0, 5, num_trades)), 2),
+        'quantity': np.round(rng.exponential(0.07, num_trades) + 0.001, 3),
+        'transact_time': 1_700_000_000_000 + np.cumsum(rng.integers(1, 500, num_trades)),
+        'is_buyer_maker': rng.random(num_trades) < 0.5,
+    })
+    for name, sample_threshold in (('tick', 100), ('volume', 5.0), ('dollar', 150_000.0)):
+        sample_bars = check_chunk_invariance(sample, name, sample_threshold)
+        print(f"{name} bars: {len(sample_bars)} 根，各種 chunk 大小的結果一致。")
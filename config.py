@@ -19,3 +19,7 @@ INTERVAL = Client.KLINE_INTERVAL_1MINUTE
 OUTPUT_FILENAME = 'btc_futures_price_3_years.npz'
 # 資料起始時間（幾年前）
 YEARS_AGO = 3
+# 以精簡格式儲存 npz (價格 float32 或放大後的 int32、成交量 float32、時間為 int32 分鐘偏移量)
+COMPACT_STORAGE = False
+# 優化器的記憶體預算 (MB)；None 代表不限制，使用 float64 載入
+MEMORY_BUDGET_MB = None
@@ -3,39 +3,53 @@ import numpy as np
 import pandas as pd
 import os
 
+from data_saver import NPZ_EPOCH_KEY, NPZ_TIME_STEP_KEY, NPZ_PRICE_SCALE_KEY, NPZ_TIME_UNIT_KEY, PRICE_COLUMNS
+
 class DataLoader:
     """
     專門用於從檔案載入數據的類別。
     """
     @staticmethod
-    def load_npz_to_dataframe(file_path: str) -> pd.DataFrame:
+    def load_npz_to_dataframe(file_path: str, precision: str = 'float64') -> pd.DataFrame:
         """
         從 .npz 檔案載入數據並轉換為 Pandas DataFrame。
-        
+        同時支援一般格式與 NpzDataSaver 的精簡 (compact) 格式。
+
         :param file_path: .npz 檔案的路徑。
+        :param precision: 數值欄位在記憶體中的精度，'float64' 或 'float32' (約省一半記憶體)。
         :return: 包含市場數據的 DataFrame，並以 'Open time' 為索引。
         """
+        if precision not in ('float64', 'float32'):
+            raise ValueError("precision 必須是 'float64' 或 'float32'。")
+
         if not os.path.exists(file_path):
             print(f"錯誤：找不到數據檔案 '{file_path}'。")
             return pd.DataFrame()
-            
+
         print(f"從 '{file_path}' 載入數據...")
         try:
             with np.load(file_path) as data:
                 # 建立 DataFrame 並直接設定索引
+                open_time, unit = DataLoader._decode_time(data)
                 df = pd.DataFrame(
-                    index=pd.to_datetime(data['open_time'], unit='s')
+                    index=pd.to_datetime(open_time, unit=unit)
                 )
                 df.index.name = 'Open time'
 
+                # 精簡格式的價格可能以放大後的 int32 儲存
+                price_scale = data[NPZ_PRICE_SCALE_KEY].item() if NPZ_PRICE_SCALE_KEY in data.files else None
+
                 # 載入所有其他 array
                 for key in data.files:
-                    if key != 'open_time':
+                    if key != 'open_time' and not key.startswith('__'):
                         # 將 'high' -> 'High', 'open_time' -> 'Open time'
                         # This naming convention is a bit complex, simplifying
                         col_name = key.replace('_', ' ').title()
-                        df[col_name] = data[key]
-                
+                        values = data[key]
+                        if price_scale is not None and key in PRICE_COLUMNS and values.dtype.kind == 'i':
+                            values = values / np.float64(price_scale)
+                        df[col_name] = values.astype(precision, copy=False)
+
                 # 為了與 pandas-ta 兼容，需要標準的 OHLCV 欄位名稱
                 df.rename(columns={
                     'High': 'high',
@@ -51,3 +65,14 @@ class DataLoader:
             print(f"載入 .npz 檔案時發生錯誤: {e}")
             return pd.DataFrame()
 
+    @staticmethod
+    def _decode_time(data) -> tuple:
+        """
+        回傳 (unix epoch 時間, 單位)。單位預設為秒，非整秒的數據 (例如 tick bars) 以毫秒儲存；
+        精簡格式以 int32 偏移量儲存，需加回起始時間。
+        """
+        unit = str(data[NPZ_TIME_UNIT_KEY]) if NPZ_TIME_UNIT_KEY in data.files else 's'
+        open_time = data['open_time'].astype(np.int64)
+        if NPZ_EPOCH_KEY in data.files:
+            open_time = data[NPZ_EPOCH_KEY].item() + open_time * data[NPZ_TIME_STEP_KEY].item()
+        return open_time, unit
@@ -29,26 +29,107 @@ class CsvDataSaver(DataSaver):
         except Exception as e:
             print(f"儲存檔案時發生錯誤: {e}")
 
+# Metadata keys stored alongside the columns of compact .npz files
+NPZ_EPOCH_KEY = '__epoch__'
+NPZ_TIME_STEP_KEY = '__time_step__'
+NPZ_PRICE_SCALE_KEY = '__price_scale__'
+# Unit of 'open_time' (and of the epoch/time step in compact files); absent means seconds
+NPZ_TIME_UNIT_KEY = '__time_unit__'
+
+# Columns treated as prices in compact mode
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+
 class NpzDataSaver(DataSaver):
     """
     A concrete implementation for saving data to a compressed NPZ file.
+
+    In compact mode, prices are stored as float32 (or as int32 scaled by 10**price_decimals), all other
+    columns as float32, and 'open_time' as int32 offsets from an epoch in minutes (or seconds when the
+    timestamps are not whole minutes). DataLoader reads both layouts.
+
+    'open_time' is stored in epoch seconds. Timestamps that are not whole seconds (e.g. tick, volume
+    and dollar bars) are stored in milliseconds instead, flagged by NPZ_TIME_UNIT_KEY, so they round-trip.
     """
+    def __init__(self, compact: bool = False, price_dtype: str = 'float32', price_decimals: int = 2):
+        """
+        :param compact: Whether to use the compact layout.
+        :param price_dtype: 'float32' or 'int32' (scaled integers) for prices in compact mode.
+        :param price_decimals: Number of decimals kept when prices are stored as scaled int32.
+        """
+        if price_dtype not in ('float32', 'int32'):
+            raise ValueError("price_dtype must be 'float32' or 'int32'.")
+        self.compact = compact
+        self.price_dtype = price_dtype
+        self.price_decimals = price_decimals
+
     def save(self, data: pd.DataFrame, file_path: str):
         """
         Converts the DataFrame to a dictionary of NumPy arrays and saves it 
         as a compressed .npz file.
         """
         try:
-            # Convert timestamp to unix epoch seconds for efficient storage
-            data_to_save = {
-                'open_time': data['Open time'].astype('int64') // 10**9
-            }
+            # Convert timestamp to unix epoch seconds for efficient storage,
+            # falling back to milliseconds when sub-second precision would otherwise be lost
+            open_time_ms = data['Open time'].astype('datetime64[ns]').astype('int64').to_numpy() // 10**6
+            if np.all(open_time_ms % 1000 == 0):
+                open_time, unit = open_time_ms // 1000, 's'
+            else:
+                open_time, unit = open_time_ms, 'ms'
+
+            if self.compact:
+                data_to_save = self._encode_time(open_time, unit)
+            else:
+                data_to_save = {'open_time': open_time}
+                if unit == 'ms':
+                    data_to_save[NPZ_TIME_UNIT_KEY] = np.str_(unit)
+
             # Add other columns
             for col in data.columns:
                 if col != 'Open time':
-                    data_to_save[col.lower().replace(' ', '_')] = data[col].to_numpy(dtype=np.float64)
+                    key = col.lower().replace(' ', '_')
+                    if self.compact:
+                        data_to_save.update(self._encode_column(key, data[col].to_numpy(dtype=np.float64)))
+                    else:
+                        data_to_save[key] = data[col].to_numpy(dtype=np.float64)
 
             np.savez_compressed(file_path, **data_to_save)
             print(f"數據已成功儲存至 '{file_path}'")
         except Exception as e:
             print(f"儲存為 .npz 檔案時發生錯誤: {e}")
+
+    @staticmethod
+    def _encode_time(open_time: np.ndarray, unit: str) -> dict:
+        """Stores epoch timestamps as int32 offsets from the first timestamp."""
+        epoch = int(open_time[0]) if len(open_time) else 0
+        offsets = open_time - epoch
+        minute = 60 if unit == 's' else 60_000
+        time_step = minute if np.all(offsets % minute == 0) else 1
+        offsets = offsets // time_step
+
+        dtype = np.int32
+        if len(offsets) and offsets.max() > np.iinfo(np.int32).max:
+            if unit == 's':
+                raise ValueError("Time range is too long to be stored as int32 offsets.")
+            # int32 milliseconds only cover about 24 days
+            print("  'open_time' 的毫秒偏移量超出 int32 範圍，改用 int64。")
+            dtype = np.int64
+
+        encoded = {
+            'open_time': offsets.astype(dtype),
+            NPZ_EPOCH_KEY: np.int64(epoch),
+            NPZ_TIME_STEP_KEY: np.int64(time_step),
+        }
+        if unit == 'ms':
+            encoded[NPZ_TIME_UNIT_KEY] = np.str_(unit)
+        return encoded
+
+    def _encode_column(self, key: str, values: np.ndarray) -> dict:
+        """Stores prices as float32 or scaled int32 and every other column as float32."""
+        if key in PRICE_COLUMNS and self.price_dtype == 'int32':
+            scale = 10 ** self.price_decimals
+            scaled = np.round(values * scale)
+            if np.isnan(values).any() or np.abs(scaled).max(initial=0) > np.iinfo(np.int32).max:
+                print(f"  '{key}' 無法以 int32 儲存 (含 NaN 或超出範圍)，改用 float32。")
+            else:
+                return {key: scaled.astype(np.int32), NPZ_PRICE_SCALE_KEY: np.int64(scale)}
+        return {key: values.astype(np.float32)}
@@ -1,4 +1,5 @@
 # indicators.py
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
 
@@ -16,6 +17,11 @@ class IndicatorCalculator:
         :return: 附加了指標欄位的 DataFrame。
         """
         print(f"開始計算技術指標...")
+
+        # 精簡模式載入的 float32 欄位先轉回 float64，確保指標與回測中的累加保持精度
+        float32_cols = df.select_dtypes(include='float32').columns
+        if len(float32_cols):
+            df[float32_cols] = df[float32_cols].astype(np.float64)
         
         # 計算移動平均線 (MA)
         if sma_windows:
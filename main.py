@@ -1,21 +1,58 @@
 # main.py
-from optimizer import run_optimizer
+from optimizer import DEFAULT_STRATEGY, STRATEGIES, run_optimizer, run_worker
+import argparse
 import os
 import config
 
+def parse_args():
+    """
+    解析命令列參數。
+    未指定 --queue 時維持原本的單機優化流程。
+    """
+    parser = argparse.ArgumentParser(description="策略優化器")
+    parser.add_argument('--role', choices=['coordinator', 'worker'], default='coordinator',
+                        help="coordinator 發布實驗並彙整結果；worker 從工作佇列領取實驗執行。")
+    parser.add_argument('--queue', default=None,
+                        help="工作佇列 URL，例如 sqlite:///output/optimizer_queue.sqlite 或 tcp://host:50000。")
+    parser.add_argument('--serve', default=None,
+                        help="協調者以 TCP 對外提供佇列的位址，例如 0.0.0.0:50000。")
+    parser.add_argument('--local-workers', type=int, default=None,
+                        help="協調者在本機額外啟動的工作者數量；未指定時依記憶體預算決定。")
+    parser.add_argument('--strategy', choices=list(STRATEGIES), default=DEFAULT_STRATEGY,
+                        help="要優化的策略；ExpressionStrategy 以 optimizer.RULE_GRID 的規則變體進行批次回測。")
+    parser.add_argument('--memory-budget', type=float, default=config.MEMORY_BUDGET_MB,
+                        help="記憶體預算 (MB)，用來選擇數據精度 (float64/float32) 與本機工作者數量。")
+    return parser.parse_args()
+
 def main():
     """
     程式主入口。
-    負責執行策略優化器。
+    負責執行策略優化器 (單機、協調者或工作者)。
     """
-    print("--- 策略優化器啟動 ---")
-    
+    args = parse_args()
+
     # 確保輸出目錄存在
     os.makedirs(config.OUTPUT_DIR, exist_ok=True)
-    
-    run_optimizer()
-    
+
+    if args.role == 'worker':
+        if args.queue is None:
+            print("錯誤：工作者必須以 --queue 指定工作佇列。")
+            return
+        print("--- 優化器工作者啟動 ---")
+        run_worker(args.queue)
+        return
+
+    print("--- 策略優化器啟動 ---")
+
+    serve_address = None
+    if args.serve:
+        host, port = args.serve.rsplit(':', 1)
+        serve_address = (host, int(port))
+
+    run_optimizer(queue_url=args.queue, serve_address=serve_address, local_workers=args.local_workers,
+                  memory_budget_mb=args.memory_budget, strategy_name=args.strategy)
+
     print("\n--- 所有優化流程已完成 ---")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,124 @@
+# memory_budget.py
+import os
+import sys
+import zipfile
+import numpy as np
+import pandas as pd
+
+# 每個工作者程序本身 (Python、pandas、numpy 等) 的大約記憶體用量
+PROCESS_OVERHEAD_BYTES = 200 * 1024**2
+# 每個實驗在 1 分鐘數據上重採樣時，每列額外需要的暫存空間 (分組代碼與中間結果)
+EXPERIMENT_BYTES_PER_ROW = 16
+# DatetimeIndex 每列佔用的位元組
+INDEX_BYTES_PER_ROW = 8
+
+PRECISION_ITEMSIZE = {'float64': 8, 'float32': 4}
+
+
+def inspect_npz(file_path: str) -> tuple:
+    """
+    只讀取 .npz 中各陣列的標頭，不載入數據，回傳 (列數, 數值欄位數)。
+    """
+    rows, columns = 0, 0
+    with zipfile.ZipFile(file_path) as archive:
+        for name in archive.namelist():
+            key = name[:-len('.npy')] if name.endswith('.npy') else name
+            with archive.open(name) as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, _, _ = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, _, _ = np.lib.format.read_array_header_2_0(f)
+            if key == 'open_time':
+                rows = shape[0]
+            elif not key.startswith('__'):
+                columns += 1
+    return rows, columns
+
+
+def estimate_dataset_bytes(file_path: str, precision: str) -> int:
+    """估計以指定精度載入後 DataFrame 的記憶體用量。"""
+    rows, columns = inspect_npz(file_path)
+    return rows * (INDEX_BYTES_PER_ROW + columns * PRECISION_ITEMSIZE[precision])
+
+
+def plan_memory(file_path: str, budget_mb: float, max_workers: int = None) -> dict:
+    """
+    依記憶體預算選擇載入精度與可同時執行的工作者數量。
+
+    每個工作者各自載入一份數據，因此每個工作者的用量為
+    程序本身 + 數據 + 實驗暫存空間。優先使用 float64；若 float64 無法讓
+    max_workers 個工作者同時執行，而 float32 可以容納更多工作者，則改用 float32。
+
+    :param file_path: .npz 數據檔案。
+    :param budget_mb: 記憶體預算 (MB)。
+    :param max_workers: 工作者數量上限，預設為 CPU 核心數；0 視為 1 (協調者自身只載入一份數據)。
+    :return: 包含 'precision', 'workers', 'per_worker_mb', 'budget_mb' 的字典。
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(max_workers, 1)
+    budget_bytes = budget_mb * 1024**2
+    rows, _ = inspect_npz(file_path)
+
+    plans = []
+    for precision in ('float64', 'float32'):
+        per_worker = (PROCESS_OVERHEAD_BYTES + estimate_dataset_bytes(file_path, precision)
+                      + rows * EXPERIMENT_BYTES_PER_ROW)
+        workers = int(min(max_workers, budget_bytes // per_worker))
+        plans.append({
+            'precision': precision,
+            'workers': workers,
+            'per_worker_mb': per_worker / 1024**2,
+            'budget_mb': budget_mb,
+        })
+
+    float64_plan, float32_plan = plans
+    if float64_plan['workers'] >= max_workers or float64_plan['workers'] >= float32_plan['workers']:
+        plan = float64_plan
+    else:
+        plan = float32_plan
+
+    if plan['workers'] < 1:
+        raise ValueError(f"記憶體預算 {budget_mb} MB 不足以載入 '{file_path}' "
+                         f"(float32 每個工作者約需 {float32_plan['per_worker_mb']:.0f} MB)。")
+
+    print(f"記憶體規劃: 精度 {plan['precision']}, {plan['workers']} 個工作者, "
+          f"每個約 {plan['per_worker_mb']:.0f} MB (預算 {budget_mb} MB)。")
+    return plan
+
+
+def report_footprint(df: pd.DataFrame, label: str = '數據') -> dict:
+    """
+    打印並回傳實際量測的記憶體用量：DataFrame 本身與目前程序的峰值常駐記憶體。
+    """
+    frame_bytes = int(df.memory_usage(index=True, deep=True).sum())
+    peak_rss_bytes = _peak_rss_bytes()
+    dtypes = ', '.join(sorted({str(dtype) for dtype in df.dtypes}))
+    rss_text = f"{peak_rss_bytes / 1024**2:.1f} MB" if peak_rss_bytes is not None else "無法取得"
+    print(f"記憶體報告 ({label}): DataFrame {frame_bytes / 1024**2:.1f} MB "
+          f"({len(df)} 列, {dtypes}), 程序峰值 RSS {rss_text}。")
+    return {
+        'frame_mb': frame_bytes / 1024**2,
+        'peak_rss_mb': peak_rss_bytes / 1024**2 if peak_rss_bytes is not None else None,
+    }
+
+
+def _peak_rss_bytes():
+    """
+    回傳目前程序的峰值常駐記憶體 (位元組)；無法取得時回傳 None。
+    `resource` 只存在於 Unix；Windows 上改用 psutil (若有安裝)。
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss 在 macOS 上以位元組為單位，在 Linux 上以 KB 為單位
+    return peak if sys.platform == 'darwin' else peak * 1024
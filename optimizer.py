@@ -1,79 +1,240 @@
 # optimizer.py
+import numpy as np
 import pandas as pd
 import os
 import itertools
+import hashlib
+import multiprocessing
+import socket
+import sqlite3
+import time
+import traceback
 
 from data_loader import DataLoader
 from indicators import IndicatorCalculator
-from strategies import MaCrossStrategyWithTrendFilter
+from strategies import MaCrossStrategyWithTrendFilter, ExpressionStrategy
+from strategy_rules import parse_rule
 from backtester import Backtester
+from memory_budget import plan_memory, report_footprint
+from work_queue import (PENDING, RUNNING, LeaseKeeper, get_authkey, open_work_queue,
+                        serve_work_queue, task_id_for)
 import config
 
-def run_optimizer():
+# 參數網格定義
+PARAM_GRID = {
+    'timeframe': ['30m', '1h', '4h'],
+    'short_window': [10, 20],
+    'long_window': [40, 60],
+    'trend_window': [150, 200]
+}
+
+# ExpressionStrategy 的參數網格：每個 rule 是一個規則變體，同一時間框架的所有規則一起編譯與計算
+RULE_GRID = {
+    'timeframe': ['1h', '4h'],
+    'rule': [f"sma({short}) > sma({long}) & sma({long}) > sma({trend})"
+             for short, long, trend in itertools.product([10, 20], [40, 60], [150, 200])]
+            + [f"ema({short}) > ema({long}) & close > sma({trend})"
+               for short, long, trend in itertools.product([10, 20], [40, 60], [150, 200])],
+}
+
+# 可在實驗規格中以名稱指定的策略
+STRATEGIES = {
+    'MaCrossStrategyWithTrendFilter': MaCrossStrategyWithTrendFilter,
+    'ExpressionStrategy': ExpressionStrategy,
+}
+
+# 各策略預設使用的參數網格
+STRATEGY_GRIDS = {
+    'MaCrossStrategyWithTrendFilter': PARAM_GRID,
+    'ExpressionStrategy': RULE_GRID,
+}
+
+DEFAULT_STRATEGY = 'MaCrossStrategyWithTrendFilter'
+
+# 工作佇列中每個規則任務最多包含的規則變體數量
+RULES_PER_TASK = 256
+
+# 工作者在佇列暫時無法存取時的最長等待秒數
+MAX_QUEUE_BACKOFF_SECONDS = 60.0
+
+# 協調者重啟或關閉時，tcp:// 佇列的代理物件拋出 EOFError / ConnectionError (包含連線被拒)
+QUEUE_CONNECTION_ERRORS = (EOFError, ConnectionError)
+# 工作者可以等待後重試的佇列錯誤；SQLite 的 OperationalError 通常是 database is locked
+QUEUE_ERRORS = (sqlite3.OperationalError,) + QUEUE_CONNECTION_ERRORS
+
+
+def build_experiments(param_grid: dict) -> list:
+    """從網格中生成所有參數組合。"""
+    keys, values = zip(*param_grid.items())
+    return [dict(zip(keys, v)) for v in itertools.product(*values)]
+
+
+def run_experiment(df_1m: pd.DataFrame, params: dict, strategy_name: str = DEFAULT_STRATEGY):
     """
-    執行策略優化，測試多組參數。
+    對 1 分鐘數據執行單一回測實驗。
+
+    :param df_1m: 以 DataLoader 載入的 1 分鐘 K 線數據。
+    :param params: 包含 'timeframe' 與策略參數的字典。
+    :param strategy_name: STRATEGIES 中的策略名稱。
+    :return: 參數與績效摘要合併後的字典；數據不足時回傳 None。
     """
-    # --- 1. 參數網格定義 ---
-    param_grid = {
-        'timeframe': ['30m', '1h', '4h'],
-        'short_window': [10, 20],
-        'long_window': [40, 60],
-        'trend_window': [150, 200]
-    }
-    # 從網格中生成所有參數組合
-    keys, values = zip(*param_grid.items())
-    experiments = [dict(zip(keys, v)) for v in itertools.product(*values)]
+    if _is_rule_strategy(strategy_name):
+        return run_rule_sweep(df_1m, params['timeframe'], [params['rule']])[0]
 
-    print(f"將要執行 {len(experiments)} 次回測實驗...")
+    # 1. 重採樣數據
+    df_resampled = _resample(df_1m, params['timeframe'])
 
-    # --- 2. 數據載入 ---
-    df_1m = DataLoader.load_npz_to_dataframe(config.OUTPUT_FILENAME)
-    if df_1m.empty:
-        print("數據載入失敗，優化器終止。")
-        return
+    # 2. 計算所需指標
+    sma_windows = [params['short_window'], params['long_window'], params['trend_window']]
+    df_with_indicators = IndicatorCalculator.add_indicators(df_resampled, sma_windows=sma_windows)
 
-    all_results = []
-    
-    # --- 3. 遍歷執行所有實驗 ---
-    for i, params in enumerate(experiments):
-        print(f"\n--- 實驗 {i+1}/{len(experiments)}: {params} ---")
-        
-        try:
-            # 3.1 重採樣數據
-            tf = params['timeframe']
-            resample_rules = {'open':'first', 'high':'max', 'low':'min', 'close':'last', 'volume':'sum'}
-            df_resampled = df_1m.resample(tf).apply(resample_rules).dropna()
-
-            # 3.2 計算所需指標
-            sma_windows = [params['short_window'], params['long_window'], params['trend_window']]
-            df_with_indicators = IndicatorCalculator.add_indicators(df_resampled, sma_windows=sma_windows)
-            
-            if len(df_with_indicators) < params['trend_window']:
-                print("數據不足以進行此參數的回測，跳過。")
-                continue
-
-            # 3.3 產生信號
-            strategy = MaCrossStrategyWithTrendFilter(
-                df_with_indicators, 
-                short_window=params['short_window'], 
-                long_window=params['long_window'], 
-                trend_window=params['trend_window']
-            )
-            df_with_signals = strategy.generate_signals()
+    if len(df_with_indicators) < params['trend_window']:
+        print("數據不足以進行此參數的回測，跳過。")
+        return None
 
-            # 3.4 執行回測
-            backtester = Backtester(df_with_signals, initial_cash=100000, commission=0.001)
-            _, summary = backtester.run()
+    # 3. 產生信號
+    strategy_params = {key: value for key, value in params.items() if key != 'timeframe'}
+    strategy = STRATEGIES[strategy_name](df_with_indicators, **strategy_params)
+    df_with_signals = strategy.generate_signals()
 
-            # 3.5 記錄結果
-            # 將 params 字典和 summary 字典合併
-            full_summary = {**params, **summary}
-            all_results.append(full_summary)
+    # 4. 執行回測
+    backtester = Backtester(df_with_signals, initial_cash=100000, commission=0.001)
+    _, summary = backtester.run()
 
-        except Exception as e:
-            print(f"實驗 {params} 發生錯誤: {e}")
+    # 5. 將 params 字典和 summary 字典合併
+    return {**params, **summary}
+
+
+def run_rule_sweep(df_1m: pd.DataFrame, timeframe: str, rules: list) -> list:
+    """
+    對同一時間框架的多個規則變體執行回測。
+    數據只重採樣一次，所有規則編譯成同一個 CompiledRules，共用的指標與子表達式只計算一次；
+    之後才逐一回測每個規則的信號。
+
+    :param df_1m: 以 DataLoader 載入的 1 分鐘 K 線數據。
+    :param timeframe: 時間框架，例如 '1h'。
+    :param rules: 規則字串列表。
+    :return: 與 rules 對齊的結果列表 ('timeframe', 'rule' 與績效摘要)；數據不足的規則為 None。
+    """
+    df_resampled = _resample(df_1m, timeframe)
+    # 規則中的 sma()/ema() 由 CompiledRules 計算；這裡只加入 RSI 與 KD 等固定指標，
+    # 因此不論單獨或批次執行，每個規則都在相同的數據列上回測
+    df_with_indicators = IndicatorCalculator.add_indicators(df_resampled)
+    signals = ExpressionStrategy.sweep_signals(df_with_indicators, rules)
+
+    prices = df_with_indicators[['close']]
+    results = []
+    for i, rule in enumerate(rules):
+        if len(df_with_indicators) < ExpressionStrategy.warmup_length(rule):
+            print(f"數據不足以進行規則 '{rule}' 的回測，跳過。")
+            results.append(None)
+            continue
+        backtester = Backtester(prices.assign(signal=signals[str(i)]), initial_cash=100000, commission=0.001)
+        _, summary = backtester.run()
+        results.append({'timeframe': timeframe, 'rule': rule, **summary})
+    return results
+
+
+def run_task(df_1m: pd.DataFrame, spec: dict) -> dict:
+    """
+    執行工作佇列中的一個任務規格，回傳要存入佇列的結果。
+    規則任務 (params 中有 'rules') 一次回測多個規則變體，結果放在 'results' 列表中；
+    其他任務為單一實驗，數據不足而跳過時回傳空字典。
+    """
+    if 'rules' in spec['params']:
+        return {'results': run_rule_sweep(df_1m, spec['timeframe'], spec['params']['rules'])}
+    params = {'timeframe': spec['timeframe'], **spec['params']}
+    return run_experiment(df_1m, params, strategy_name=spec['strategy']) or {}
+
+
+def _is_rule_strategy(strategy_name: str) -> bool:
+    """規則策略的實驗以規則變體為單位，可以批次計算。"""
+    return issubclass(STRATEGIES[strategy_name], ExpressionStrategy)
+
+
+def _group_rules_by_timeframe(experiments: list) -> dict:
+    """將規則實驗依時間框架分組，保持原本的順序。"""
+    groups = {}
+    for params in experiments:
+        groups.setdefault(params['timeframe'], []).append(params['rule'])
+    return groups
+
+
+def _resample(df_1m: pd.DataFrame, tf: str) -> pd.DataFrame:
+    """將 1 分鐘數據重採樣為指定的時間框架。"""
+    resample_rules = {'open':'first', 'high':'max', 'low':'min', 'close':'last', 'volume':'sum'}
+    # 以 float32 載入時，成交量改在 float64 中累加以保持精度 (first/max/min/last 不涉及累加)
+    precise_volume = df_1m['volume'].dtype != np.float64
+    if precise_volume:
+        resample_rules = {key: rule for key, rule in resample_rules.items() if key != 'volume'}
+    df_resampled = df_1m.resample(tf).apply(resample_rules)
+    if precise_volume:
+        df_resampled['volume'] = df_1m['volume'].astype(np.float64).resample(tf).sum()
+    return df_resampled.dropna()
+
+
+def dataset_version(file_path: str) -> str:
+    """以檔案內容的 SHA-1 作為數據版本，確保所有工作者使用相同的數據。"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_optimizer(queue_url: str = None, serve_address: tuple = None, local_workers: int = None,
+                  poll_interval: float = 5.0, memory_budget_mb: float = None,
+                  strategy_name: str = DEFAULT_STRATEGY, param_grid: dict = None):
+    """
+    執行策略優化，測試多組參數。
+
+    未指定 queue_url 時在本機依序執行所有實驗；指定時作為協調者，
+    將實驗規格發布到工作佇列，等待工作者回傳結果後產生相同的報告。
+
+    :param queue_url: 工作佇列位置，例如 'sqlite:///output/optimizer_queue.sqlite'。
+    :param serve_address: 若提供 (host, port)，以 TCP 對其他機器上的工作者提供此佇列。
+    :param local_workers: 協調者在本機額外啟動的工作者程序數量；未指定時依記憶體預算決定 (無預算時為 0)。
+    :param poll_interval: 協調者檢查進度的間隔秒數。
+    :param memory_budget_mb: 記憶體預算 (MB)；指定時自動選擇載入精度與本機工作者數量 (單機模式以單一程序規劃)。
+    :param strategy_name: STRATEGIES 中的策略名稱。ExpressionStrategy 的網格以 'rule' 列出規則變體，
+                          同一時間框架的規則會批次計算。
+    :param param_grid: 參數網格，預設為 STRATEGY_GRIDS 中該策略的網格。
+    """
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f"未知的策略 '{strategy_name}'，可用的策略: {list(STRATEGIES)}。")
+    param_grid = param_grid or STRATEGY_GRIDS[strategy_name]
+    experiments = build_experiments(param_grid)
+    if _is_rule_strategy(strategy_name):
+        # 在載入數據前先解析所有規則，語法錯誤立即拋出 ValueError
+        for params in experiments:
+            parse_rule(params['rule'])
+    print(f"將要執行 {len(experiments)} 次回測實驗...")
 
-    # --- 4. 處理與儲存結果 ---
+    precision = 'float64'
+    if memory_budget_mb is not None and os.path.exists(config.OUTPUT_FILENAME):
+        if queue_url is None:
+            # 單機模式只在本程序載入一份數據，不為用不到的並行度降低精度
+            max_workers = 1
+        elif local_workers is not None:
+            # 明確指定的 local_workers 即為上限 (0 代表只有協調者本身載入數據，視為 1)
+            max_workers = max(local_workers, 1)
+        else:
+            # 由記憶體預算決定本機工作者數量，上限為 CPU 核心數
+            max_workers = None
+        plan = plan_memory(config.OUTPUT_FILENAME, memory_budget_mb, max_workers=max_workers)
+        precision = plan['precision']
+        if queue_url is not None and local_workers is None:
+            local_workers = plan['workers']
+
+    if queue_url is None:
+        all_results = _run_local(experiments, precision, strategy_name)
+    else:
+        all_results = _run_coordinator(experiments, queue_url, serve_address, local_workers or 0,
+                                       poll_interval, precision, strategy_name, list(param_grid))
+    if all_results is None:
+        return
+
+    # --- 處理與儲存結果 ---
     if not all_results:
         print("沒有任何實驗成功，無法生成報告。")
         return
@@ -91,14 +252,211 @@ def run_optimizer():
     results_df.to_csv(summary_filepath, index=False)
     print(f"\n所有回測結果已儲存至: {summary_filepath}")
 
-    # --- 5. 打印最佳結果 ---
+    # --- 打印最佳結果 ---
     print("\n--- 最佳 5 個策略 ---")
     print(results_df.head(5).to_string())
     
-    # --- 6. 繪製總結圖表 ---
+    # --- 繪製總結圖表 ---
     plot_optimizer_results(summary_filepath)
 
 
+def _run_local(experiments: list, precision: str = 'float64', strategy_name: str = DEFAULT_STRATEGY):
+    """在本機依序執行所有實驗，回傳結果列表；數據載入失敗時回傳 None。"""
+    df_1m = DataLoader.load_npz_to_dataframe(config.OUTPUT_FILENAME, precision=precision)
+    if df_1m.empty:
+        print("數據載入失敗，優化器終止。")
+        return None
+    report_footprint(df_1m, label=config.OUTPUT_FILENAME)
+
+    all_results = []
+    if _is_rule_strategy(strategy_name):
+        # 同一時間框架的規則變體一起執行，共用重採樣、指標與子表達式
+        for timeframe, rules in _group_rules_by_timeframe(experiments).items():
+            print(f"\n--- 時間框架 {timeframe}: {len(rules)} 個規則變體 ---")
+            try:
+                all_results.extend(result for result in run_rule_sweep(df_1m, timeframe, rules) if result)
+            except Exception as e:
+                print(f"時間框架 {timeframe} 的規則回測發生錯誤: {e}")
+        return all_results
+
+    for i, params in enumerate(experiments):
+        print(f"\n--- 實驗 {i+1}/{len(experiments)}: {params} ---")
+        try:
+            result = run_experiment(df_1m, params, strategy_name)
+            if result is not None:
+                all_results.append(result)
+        except Exception as e:
+            print(f"實驗 {params} 發生錯誤: {e}")
+    return all_results
+
+
+def _run_coordinator(experiments: list, queue_url: str, serve_address: tuple, local_workers: int,
+                     poll_interval: float, precision: str = 'float64', strategy_name: str = DEFAULT_STRATEGY,
+                     grid_keys: list = None):
+    """
+    作為協調者發布實驗規格並等待所有任務結束，回傳已完成實驗的結果列表。
+    已在佇列中完成的相同規格不會重新執行。
+    規則策略的實驗依時間框架分批發布，每個任務最多包含 RULES_PER_TASK 個規則變體。
+    """
+    grid_keys = grid_keys or list(PARAM_GRID)
+    if not os.path.exists(config.OUTPUT_FILENAME):
+        print(f"錯誤：找不到數據檔案 '{config.OUTPUT_FILENAME}'，優化器終止。")
+        return None
+
+    version = dataset_version(config.OUTPUT_FILENAME)
+    if _is_rule_strategy(strategy_name):
+        tasks = [(timeframe, {'rules': rules[start:start + RULES_PER_TASK]})
+                 for timeframe, rules in _group_rules_by_timeframe(experiments).items()
+                 for start in range(0, len(rules), RULES_PER_TASK)]
+    else:
+        tasks = [(params['timeframe'], {key: value for key, value in params.items() if key != 'timeframe'})
+                 for params in experiments]
+    specs = [{
+        'dataset': config.OUTPUT_FILENAME,
+        'dataset_version': version,
+        'precision': precision,
+        'strategy': strategy_name,
+        'timeframe': timeframe,
+        'params': params,
+    } for timeframe, params in tasks]
+    task_ids = [task_id_for(spec) for spec in specs]
+
+    queue = open_work_queue(queue_url)
+    if serve_address is not None:
+        serve_work_queue(queue, serve_address, get_authkey())
+
+    added = queue.publish(specs)
+    print(f"已發布 {added} 個新任務或重新發布的失敗任務 ({len(specs) - added} 個已在佇列中或已完成)。")
+
+    workers = []
+    for _ in range(local_workers):
+        process = multiprocessing.Process(target=run_worker, args=(queue_url,), kwargs={'stop_when_drained': True})
+        process.start()
+        workers.append(process)
+
+    last_stats = None
+    while True:
+        stats = queue.stats(task_ids)
+        if stats != last_stats:
+            print(f"任務進度: {stats}")
+            last_stats = stats
+        if stats[PENDING] + stats[RUNNING] == 0:
+            break
+        time.sleep(poll_interval)
+
+    for process in workers:
+        process.join()
+
+    for failed in queue.errors(task_ids):
+        print(f"任務最終失敗 {failed['spec']}: {failed['error']}")
+
+    # 數據不足而跳過的實驗以空字典 (規則任務中為 None) 表示；參數欄位依網格順序排列，與單機模式的報告一致
+    all_results = []
+    for result in queue.results(task_ids):
+        for item in result.get('results', [result]):
+            if item:
+                all_results.append({**{key: item[key] for key in grid_keys}, **item})
+    return all_results
+
+
+def run_worker(queue_url: str, worker_id: str = None, lease_seconds: float = 600.0,
+               poll_interval: float = 2.0, stop_when_drained: bool = False):
+    """
+    工作者主迴圈：從工作佇列領取實驗規格、執行回測並回傳結果。
+
+    :param queue_url: 工作佇列位置 ('sqlite:///...' 或 'tcp://host:port')。
+    :param worker_id: 工作者名稱，預設為 主機名稱-PID。
+    :param lease_seconds: 每次領取任務的租約長度；執行期間會自動延長。
+    :param poll_interval: 沒有任務時的等待秒數；佇列暫時無法存取時以此為起點逐步延長等待。
+    :param stop_when_drained: 佇列中沒有待執行或執行中的任務時結束，否則持續等待新任務。
+                              與佇列的連線中斷時 (協調者已關閉) 也直接結束，否則逐步延長等待並重新連線。
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    print(f"工作者 {worker_id} 已啟動，連線至 {queue_url}。")
+    queue = None
+
+    # 快取已載入的數據，避免每個任務重新讀取檔案
+    datasets = {}
+
+    # 佇列暫時無法存取 (例如共享目錄上的 database is locked 或協調者重啟) 時的等待秒數，逐次加倍
+    backoff = poll_interval
+
+    while True:
+        try:
+            if queue is None:
+                queue = open_work_queue(queue_url)
+            task = queue.claim(worker_id, lease_seconds)
+            stats = queue.stats() if task is None else None
+        except QUEUE_ERRORS as e:
+            if not _wait_for_queue(worker_id, e, backoff, stop_when_drained):
+                return
+            if isinstance(e, QUEUE_CONNECTION_ERRORS):
+                queue = None
+            backoff = min(backoff * 2, MAX_QUEUE_BACKOFF_SECONDS)
+            continue
+        backoff = poll_interval
+
+        if task is None:
+            if stop_when_drained and stats[PENDING] + stats[RUNNING] == 0:
+                print(f"工作者 {worker_id}: 佇列已清空，結束。")
+                return
+            time.sleep(poll_interval)
+            continue
+
+        spec = task['spec']
+        if 'rules' in spec['params']:
+            params = {'timeframe': spec['timeframe'], 'rules': f"{len(spec['params']['rules'])} 個規則變體"}
+        else:
+            params = {'timeframe': spec['timeframe'], **spec['params']}
+        print(f"\n--- 工作者 {worker_id} 執行任務 {task['task_id'][:8]} (第 {task['attempts']} 次): {params} ---")
+
+        error = None
+        try:
+            with LeaseKeeper(queue, task['task_id'], worker_id, lease_seconds):
+                precision = spec.get('precision', 'float64')
+                key = (spec['dataset'], spec['dataset_version'], precision)
+                if key not in datasets:
+                    if dataset_version(spec['dataset']) != spec['dataset_version']:
+                        raise ValueError(f"本機數據 '{spec['dataset']}' 與任務的數據版本不符。")
+                    datasets[key] = DataLoader.load_npz_to_dataframe(spec['dataset'], precision=precision)
+                    if not datasets[key].empty:
+                        report_footprint(datasets[key], label=f"工作者 {worker_id}")
+                if datasets[key].empty:
+                    raise ValueError(f"數據 '{spec['dataset']}' 載入失敗。")
+
+                result = run_task(datasets[key], spec)
+        except Exception as e:
+            print(f"任務 {params} 發生錯誤: {e}")
+            error = traceback.format_exc()
+
+        try:
+            if error is None:
+                queue.complete(task['task_id'], worker_id, result)
+            else:
+                queue.fail(task['task_id'], worker_id, error)
+        except QUEUE_ERRORS as e:
+            # 無法回報的任務仍持有租約，租約到期後會重新分派給其他工作者
+            print(f"工作者 {worker_id}: 無法回報任務 {task['task_id'][:8]} 的結果，租約到期後將重新分派。")
+            if not _wait_for_queue(worker_id, e, backoff, stop_when_drained):
+                return
+            if isinstance(e, QUEUE_CONNECTION_ERRORS):
+                queue = None
+            backoff = min(backoff * 2, MAX_QUEUE_BACKOFF_SECONDS)
+
+
+def _wait_for_queue(worker_id: str, error: Exception, backoff: float, stop_when_drained: bool) -> bool:
+    """
+    處理工作佇列無法存取的錯誤：等待 backoff 秒後回傳 True 讓工作者重試；
+    以 stop_when_drained 執行的工作者在與協調者的連線中斷時回傳 False，直接結束。
+    """
+    if stop_when_drained and isinstance(error, QUEUE_CONNECTION_ERRORS):
+        print(f"工作者 {worker_id}: 與工作佇列的連線中斷，結束: {error!r}")
+        return False
+    print(f"工作者 {worker_id}: 存取工作佇列時發生錯誤，{backoff:.1f} 秒後重試: {error!r}")
+    time.sleep(backoff)
+    return True
+
+
 def plot_optimizer_results(csv_filepath):
     """
     從CSV檔案讀取優化結果並繪製總結圖表。
@@ -118,10 +476,13 @@ def plot_optimizer_results(csv_filepath):
         df = df.sort_values(by='Total Return (%)', ascending=True)
 
         # 創建一個簡潔的標籤給Y軸
-        labels = df.apply(
-            lambda row: f"TF:{row['timeframe']} S:{row['short_window']} L:{row['long_window']} T:{row['trend_window']}",
-            axis=1
-        )
+        if 'rule' in df.columns:
+            labels = df.apply(lambda row: f"TF:{row['timeframe']} {row['rule']}", axis=1)
+        else:
+            labels = df.apply(
+                lambda row: f"TF:{row['timeframe']} S:{row['short_window']} L:{row['long_window']} T:{row['trend_window']}",
+                axis=1
+            )
         
         plt.figure(figsize=(12, 8))
         
@@ -137,7 +498,8 @@ def plot_optimizer_results(csv_filepath):
 
         plt.title('Optimization Results: Total Return by Strategy Parameters', fontsize=16)
         plt.xlabel('Total Return (%)', fontsize=12)
-        plt.ylabel('Strategy Parameters (Timeframe, Short, Long, Trend)', fontsize=12)
+        ylabel = 'Strategy Rule (Timeframe, Rule)' if 'rule' in df.columns else 'Strategy Parameters (Timeframe, Short, Long, Trend)'
+        plt.ylabel(ylabel, fontsize=12)
         
         # 讓Y軸標籤更清晰
         plt.tick_params(axis='y', labelsize=8)
@@ -1,6 +1,7 @@
 # strategies.py
 import pandas as pd
 from abc import ABC, abstractmethod
+from strategy_rules import compile_rules, position_to_signal
 
 class Strategy(ABC):
     """
@@ -39,19 +40,10 @@ class MaCrossStrategy(Strategy):
         if self.short_window_col not in self.df.columns or self.long_window_col not in self.df.columns:
             raise ValueError(f"數據中缺少 MA 欄位: {self.short_window_col} 或 {self.long_window_col}")
 
-        # 建立一個新的 'signal' 欄位，預設為 0 (無動作)
-        self.df['signal'] = 0
-
-        # 當短期MA > 長期MA，設定為 1 (潛在買入狀態)
-        self.df['position'] = 0
-        self.df.loc[self.df[self.short_window_col] > self.df[self.long_window_col], 'position'] = 1
-
-        # 計算 position 的變化，前一天是0，當天是1，代表黃金交叉，產生買入信號 (1)
-        # 前一天是1，當天是0，代表死亡交叉，產生賣出信號 (-1)
-        self.df['signal'] = self.df['position'].diff()
-        
-        # 移除 position 輔助欄位
-        self.df.drop(columns=['position'], inplace=True)
+        # 當短期MA > 長期MA，處於持有狀態 (position = 1)
+        # position 由0變1代表黃金交叉，產生買入信號 (1)；由1變0代表死亡交叉，產生賣出信號 (-1)
+        rules = compile_rules({'signal': f"{self.short_window_col} > {self.long_window_col}"})
+        self.df['signal'] = position_to_signal(rules.positions(self.df)['signal'])
         
         print("信號產生完畢。")
         return self.df
@@ -81,22 +73,57 @@ class MaCrossStrategyWithTrendFilter(Strategy):
         if not all(col in self.df.columns for col in required_cols):
             raise ValueError(f"數據中缺少 MA 欄位: {required_cols}")
 
-        self.df['signal'] = 0
-        
         # 條件 1: 短期MA > 中期MA
-        condition1 = self.df[self.short_window_col] > self.df[self.long_window_col]
         # 條件 2: 中期MA > 長期趨勢MA
-        condition2 = self.df[self.long_window_col] > self.df[self.trend_window_col]
-        
         # 當兩個條件都滿足時，我們希望處於持有多頭部位 (position = 1)
-        self.df['position'] = 0
-        self.df.loc[condition1 & condition2, 'position'] = 1
+        rules = compile_rules({
+            'signal': f"{self.short_window_col} > {self.long_window_col} & {self.long_window_col} > {self.trend_window_col}"
+        })
 
         # 計算 position 的變化來決定實際的買賣點
-        self.df['signal'] = self.df['position'].diff()
-        
-        self.df.drop(columns=['position'], inplace=True)
+        self.df['signal'] = position_to_signal(rules.positions(self.df)['signal'])
         
         print("帶趨勢過濾的信號產生完畢。")
         return self.df
 
+class ExpressionStrategy(Strategy):
+    """
+    以規則表達式定義的策略，不需要為每個想法撰寫新的子類別。
+    - 規則成立時持有多頭，規則由不成立變為成立時買入，反之賣出。
+    - 規則可以直接使用 sma(n), ema(n) 或 DataFrame 中的欄位，例如:
+      "sma(10) > sma(40) & sma(40) > sma(200)" 或 "close > SMA_200 & RSI_14 < 70"
+    """
+    def __init__(self, data: pd.DataFrame, rule: str):
+        super().__init__(data)
+        self.rule = rule
+        # 規則在建立策略時解析一次，語法錯誤會立即拋出 ValueError
+        self._rules = compile_rules({'signal': rule})
+
+    def generate_signals(self) -> pd.DataFrame:
+        """
+        產生規則表達式策略的交易信號。
+        """
+        print(f"正在產生規則策略信號: {self.rule}")
+        self.df['signal'] = position_to_signal(self._rules.positions(self.df)['signal'])
+        print("規則策略信號產生完畢。")
+        return self.df
+
+    @staticmethod
+    def sweep_signals(data: pd.DataFrame, rules: list) -> pd.DataFrame:
+        """
+        一次產生多個規則變體的交易信號。所有規則編譯成同一個 CompiledRules，
+        各規則共用的指標與子表達式 (例如 `sma(40) > sma(200)`) 只計算一次。
+
+        :param data: 包含規則所需欄位的 DataFrame。
+        :param rules: 規則字串列表。
+        :return: 與 data 相同索引的 DataFrame，第 i 個欄位 (名稱為 str(i)) 是 rules[i] 的 'signal'。
+        """
+        print(f"正在產生 {len(rules)} 個規則變體的信號...")
+        compiled = compile_rules({str(i): rule for i, rule in enumerate(rules)})
+        return compiled.signals(data)
+
+    @staticmethod
+    def warmup_length(rule: str) -> int:
+        """規則中最長的指標週期；數據少於此長度時不進行回測 (與 MA 策略的 trend_window 檢查相同)。"""
+        indicators = compile_rules({'signal': rule}).required_indicators()
+        return max((length for _, length, _ in indicators), default=0)
@@ -0,0 +1,339 @@
+# strategy_rules.py
+import ast
+from functools import lru_cache
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+try:
+    import numexpr
+except ImportError:  # numexpr 為選用依賴，沒有安裝時退回純 NumPy 計算
+    numexpr = None
+
+# 可以在規則中使用的指標函式，例如 sma(10) 或 ema(20, high)
+INDICATOR_FUNCTIONS = ('sma', 'ema')
+
+_COMPARE_OPS = {ast.Gt: '>', ast.GtE: '>=', ast.Lt: '<', ast.LtE: '<=', ast.Eq: '==', ast.NotEq: '!='}
+_ARITH_OPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+_NUMPY_OPS = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+    '==': np.equal, '!=': np.not_equal,
+    '+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide,
+    '&': np.logical_and, '|': np.logical_or,
+}
+
+# 表達式節點以巢狀 tuple 表示，相同的子表達式得到相同的 tuple，因此可以直接當作快取鍵:
+#   ('col', name)                     DataFrame 欄位
+#   ('const', value)                  數值常數
+#   ('ind', func, length, source)     指標，例如 ('ind', 'sma', 10, 'close')
+#   ('neg', a)                        負號
+#   ('arith', op, a, b)               + - * /
+#   ('cmp', op, a, b)                 比較運算，結果為布林
+#   ('bool', op, a, b)                & (且) 或 | (或)
+#   ('not', a)                        非
+_BOOLEAN_KINDS = ('cmp', 'bool', 'not')
+_LEAF_KINDS = ('col', 'const', 'ind')
+
+
+@lru_cache(maxsize=None)
+def parse_rule(rule: str) -> tuple:
+    """
+    將規則字串解析為表達式節點，每個規則字串只會解析一次。
+
+    語法與 pandas 的布林運算相同，但 `&`, `|`, `~` 的優先順序低於比較運算，
+    因此 `sma(10) > sma(40) & sma(40) > sma(200)` 不需要額外加括號。
+    也接受 `and`, `or`, `not` 與連續比較 (例如 `sma(200) < sma(40) < sma(10)`)。
+
+    :param rule: 規則字串。
+    :return: 表達式節點 (巢狀 tuple)。
+    """
+    source = rule.replace('&', ' and ').replace('|', ' or ').replace('~', ' not ')
+    try:
+        tree = ast.parse(source.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"無法解析規則 '{rule}': {e.msg}")
+    node = _convert(tree.body, rule)
+    if node[0] not in _BOOLEAN_KINDS:
+        raise ValueError(f"規則 '{rule}' 的結果必須是布林條件 (例如比較運算)。")
+    return node
+
+
+def _convert(node: ast.AST, rule: str) -> tuple:
+    """將 Python AST 轉換為表達式節點，只允許規則語法中的運算。"""
+    if isinstance(node, ast.BoolOp):
+        op = '&' if isinstance(node.op, ast.And) else '|'
+        values = [_require_boolean(_convert(value, rule), rule) for value in node.values]
+        result = values[0]
+        for value in values[1:]:
+            result = ('bool', op, result, value)
+        return result
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _convert(node.operand, rule)
+        if isinstance(node.op, ast.Not):
+            return ('not', _require_boolean(operand, rule))
+        if isinstance(node.op, ast.USub):
+            return ('neg', _require_numeric(operand, rule))
+        if isinstance(node.op, ast.UAdd):
+            return _require_numeric(operand, rule)
+
+    if isinstance(node, ast.Compare):
+        # 連續比較 a < b < c 等同於 (a < b) & (b < c)
+        left = _require_numeric(_convert(node.left, rule), rule)
+        result = None
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARE_OPS:
+                break
+            right = _require_numeric(_convert(comparator, rule), rule)
+            comparison = ('cmp', _COMPARE_OPS[type(op)], left, right)
+            result = comparison if result is None else ('bool', '&', result, comparison)
+            left = right
+        else:
+            return result
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH_OPS:
+        left = _require_numeric(_convert(node.left, rule), rule)
+        right = _require_numeric(_convert(node.right, rule), rule)
+        return ('arith', _ARITH_OPS[type(node.op)], left, right)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in INDICATOR_FUNCTIONS:
+        return _convert_indicator(node, rule)
+
+    if isinstance(node, ast.Name):
+        return ('col', node.id)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return ('const', float(node.value))
+
+    raise ValueError(f"規則 '{rule}' 中包含不支援的語法: {ast.dump(node)}")
+
+
+def _convert_indicator(node: ast.Call, rule: str) -> tuple:
+    """轉換 sma(length[, source]) / ema(length[, source])。"""
+    func = node.func.id
+    args = node.args
+    if node.keywords or not 1 <= len(args) <= 2:
+        raise ValueError(f"規則 '{rule}' 中 {func}() 的用法應為 {func}(週期[, 欄位])。")
+    length = args[0]
+    if not (isinstance(length, ast.Constant) and isinstance(length.value, int)
+            and not isinstance(length.value, bool) and length.value > 0):
+        raise ValueError(f"規則 '{rule}' 中 {func}() 的週期必須是正整數。")
+    source = 'close'
+    if len(args) == 2:
+        if not isinstance(args[1], ast.Name):
+            raise ValueError(f"規則 '{rule}' 中 {func}() 的第二個參數必須是欄位名稱。")
+        source = args[1].id
+    return ('ind', func, length.value, source)
+
+
+def _require_boolean(node: tuple, rule: str) -> tuple:
+    if node[0] not in _BOOLEAN_KINDS:
+        raise ValueError(f"規則 '{rule}' 中 &, |, ~ 的運算元必須是布林條件。")
+    return node
+
+
+def _require_numeric(node: tuple, rule: str) -> tuple:
+    if node[0] in _BOOLEAN_KINDS:
+        raise ValueError(f"規則 '{rule}' 中比較與算術運算的運算元必須是數值。")
+    return node
+
+
+def _children(node: tuple) -> tuple:
+    """回傳節點的子節點。"""
+    kind = node[0]
+    if kind in ('neg', 'not'):
+        return (node[1],)
+    if kind in ('arith', 'cmp', 'bool'):
+        return (node[2], node[3])
+    return ()
+
+
+def _sma(values: np.ndarray, length: int) -> np.ndarray:
+    """以累積和計算簡單移動平均，前 length-1 個值為 NaN (與 pandas-ta 相同)。"""
+    out = np.full(len(values), np.nan)
+    if len(values) < length:
+        return out
+    if np.isnan(values).any():
+        return pd.Series(values).rolling(length).mean().to_numpy()
+    # 先減去第一個值以降低累積和的數量級，保持長序列的精度
+    base = values[0]
+    cumsum = np.concatenate(([0.0], np.cumsum(values - base)))
+    out[length - 1:] = (cumsum[length:] - cumsum[:-length]) / length + base
+    return out
+
+
+def _ema(values: np.ndarray, length: int) -> np.ndarray:
+    """指數移動平均，以前 length 個值的 SMA 作為起始值 (與 pandas-ta 相同)。"""
+    if len(values) < length:
+        return np.full(len(values), np.nan)
+    seeded = values.astype(np.float64, copy=True)
+    seeded[:length - 1] = np.nan
+    seeded[length - 1] = values[:length].mean()
+    return pd.Series(seeded).ewm(span=length, adjust=False).mean().to_numpy()
+
+
+_INDICATOR_IMPLS = {'sma': _sma, 'ema': _ema}
+
+
+class CompiledRules:
+    """
+    一組已解析的規則，可以對同一份數據一次計算全部規則的部位狀態。
+    - 所有規則需要的指標只計算一次；若 DataFrame 已有 IndicatorCalculator 產生的
+      同名欄位 (例如 SMA_10)，直接沿用。
+    - 被多個規則共用的子表達式 (例如 `sma(40) > sma(200)`) 只計算一次。
+    - 安裝了 numexpr 時，每個表達式在單一融合的迴圈中計算，不產生中間陣列；
+      否則以 NumPy 逐節點計算。
+    """
+    def __init__(self, rules: Dict[str, str]):
+        """
+        :param rules: 規則名稱到規則字串的對應，例如 {'trend': 'sma(10) > sma(40) & sma(40) > sma(200)'}。
+        """
+        self.rules = dict(rules)
+        self._nodes = {name: parse_rule(rule) for name, rule in self.rules.items()}
+
+        # 計算每個節點被引用的次數，找出需要共用的子表達式
+        self._ref_counts = {}
+        for node in self._nodes.values():
+            self._count_refs(node)
+        self._shared = [node for node in self._post_order()
+                        if node[0] not in _LEAF_KINDS and self._ref_counts[node] > 1]
+
+    def _count_refs(self, node: tuple):
+        first_visit = node not in self._ref_counts
+        self._ref_counts[node] = self._ref_counts.get(node, 0) + 1
+        if first_visit:
+            for child in _children(node):
+                self._count_refs(child)
+
+    def _post_order(self) -> list:
+        """以子節點優先的順序列出所有不重複的節點。"""
+        order, seen = [], set()
+
+        def visit(node):
+            if node in seen:
+                return
+            seen.add(node)
+            for child in _children(node):
+                visit(child)
+            order.append(node)
+
+        for node in self._nodes.values():
+            visit(node)
+        return order
+
+    def required_columns(self) -> set:
+        """規則直接引用或作為指標來源的 DataFrame 欄位。"""
+        columns = set()
+        for node in self._ref_counts:
+            if node[0] == 'col':
+                columns.add(node[1])
+            elif node[0] == 'ind':
+                columns.add(node[3])
+        return columns
+
+    def required_indicators(self) -> set:
+        """規則需要的指標，例如 {('sma', 10, 'close'), ('sma', 200, 'close')}。"""
+        return {node[1:] for node in self._ref_counts if node[0] == 'ind'}
+
+    def positions(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        計算每個規則在各時間點的部位狀態。
+
+        :param df: 包含規則所需欄位的 DataFrame。
+        :return: 規則名稱到布林陣列的對應 (True 代表持有多頭)。
+        """
+        missing = self.required_columns() - set(df.columns)
+        if missing:
+            raise ValueError(f"數據中缺少規則所需的欄位: {sorted(missing)}")
+
+        env = {}
+        for node in self._post_order():
+            if node[0] in _LEAF_KINDS:
+                env[node] = self._evaluate_leaf(node, df)
+        for node in self._shared:
+            env[node] = self._evaluate(node, env)
+        return {name: self._evaluate(node, env) for name, node in self._nodes.items()}
+
+    def signals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        計算每個規則的交易信號 (1: 買入, -1: 賣出, 0: 無動作)，格式與 Strategy.generate_signals 的 'signal' 欄位相同。
+
+        :return: 以規則名稱為欄位、與 df 相同索引的 DataFrame。
+        """
+        return pd.DataFrame(
+            {name: position_to_signal(position) for name, position in self.positions(df).items()},
+            index=df.index
+        )
+
+    @staticmethod
+    def _evaluate_leaf(node: tuple, df: pd.DataFrame):
+        kind = node[0]
+        if kind == 'const':
+            return node[1]
+        if kind == 'col':
+            return df[node[1]].to_numpy(dtype=np.float64)
+        _, func, length, source = node
+        # 沿用 IndicatorCalculator (pandas-ta) 已算好的欄位
+        existing = f'{func.upper()}_{length}'
+        if source == 'close' and existing in df.columns:
+            return df[existing].to_numpy(dtype=np.float64)
+        return _INDICATOR_IMPLS[func](df[source].to_numpy(dtype=np.float64), length)
+
+    def _evaluate(self, node: tuple, env: dict):
+        if node in env:
+            return env[node]
+        if numexpr is not None:
+            variables = {}
+            expression = self._to_numexpr(node, env, variables)
+            return numexpr.evaluate(expression, local_dict=variables)
+        return self._evaluate_numpy(node, env)
+
+    def _to_numexpr(self, node: tuple, env: dict, variables: dict) -> str:
+        """產生 numexpr 表達式字串，已計算的節點 (指標、共用子表達式) 作為變數傳入。"""
+        if node in env:
+            value = env[node]
+            if node[0] == 'const':
+                return repr(value)
+            name = f'v{len(variables)}'
+            variables[name] = value
+            return name
+        kind = node[0]
+        if kind == 'neg':
+            return f'(-{self._to_numexpr(node[1], env, variables)})'
+        if kind == 'not':
+            return f'(~{self._to_numexpr(node[1], env, variables)})'
+        _, op, left, right = node
+        return f'({self._to_numexpr(left, env, variables)} {op} {self._to_numexpr(right, env, variables)})'
+
+    def _evaluate_numpy(self, node: tuple, env: dict):
+        if node in env:
+            return env[node]
+        kind = node[0]
+        if kind == 'neg':
+            result = np.negative(self._evaluate_numpy(node[1], env))
+        elif kind == 'not':
+            result = np.logical_not(self._evaluate_numpy(node[1], env))
+        else:
+            _, op, left, right = node
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = _NUMPY_OPS[op](self._evaluate_numpy(left, env), self._evaluate_numpy(right, env))
+        env[node] = result
+        return result
+
+
+def compile_rules(rules: Dict[str, str]) -> CompiledRules:
+    """將一組規則編譯為 CompiledRules。"""
+    return CompiledRules(rules)
+
+
+def position_to_signal(position: np.ndarray) -> np.ndarray:
+    """
+    將部位狀態轉換為交易信號：部位由 0 變 1 為買入 (1)，由 1 變 0 為賣出 (-1)。
+    第一個值為 NaN，與 pandas 的 diff() 結果相同。
+    """
+    position = np.asarray(position, dtype=np.int8)
+    signal = np.empty(len(position), dtype=np.float64)
+    if len(position):
+        signal[0] = np.nan
+        signal[1:] = np.diff(position)
+    return signal
@@ -0,0 +1,270 @@
+# trading_env.py
+import time
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class VectorTradingEnv:
+    """
+    給強化學習使用的向量化交易環境 (Gym 風格介面)。
+
+    N 個子環境共用同一份 OHLCV 與指標特徵陣列，每次 step 都以 NumPy 批次運算同時推進，
+    不經過 pandas，也不逐根 K 線迴圈。
+    - 動作: 0 (空手), 1 (持有多頭)，與 `Backtester` 的僅做多、全進全出假設一致。
+    - 手續費: 部位改變時，權益乘上 (1 - commission)，與 `Backtester` 的買入/賣出計算相同。
+    - 獎勵: 每步的權益變化率 (新權益 / 舊權益 - 1)。
+    - 子環境結束 (資料尾端或達到 episode_length) 時會自動以新的隨機起點重置，
+      結束前的最終觀測值放在 info['final_observation']。
+    """
+    def __init__(self, close: np.ndarray, features: np.ndarray, num_envs: int = 1,
+                 window_size: int = 32, episode_length: int = 1024,
+                 initial_cash: float = 100000.0, commission: float = 0.001,
+                 random_start: bool = True, seed: int = None, copy_obs: bool = True):
+        """
+        :param close: 收盤價陣列，形狀 (T,)。
+        :param features: 預先計算好的特徵陣列，形狀 (T, F)，與 close 逐列對齊。
+        :param num_envs: 同時推進的子環境數量 N。
+        :param window_size: 每個觀測值包含的 K 線數量。
+        :param episode_length: 每個回合最多的步數。
+        :param initial_cash: 初始資金。
+        :param commission: 交易手續費率 (例如 0.001 代表 0.1%)。
+        :param random_start: 是否以隨機起點開始每個回合；否則一律從最早可用的位置開始。
+        :param seed: 隨機數種子。
+        :param copy_obs: reset/step 回傳的 observation['window'] 是否為獨立的副本。
+                         設為 False 時直接回傳內部緩衝區以省去一次複製，但下一次 reset/step 會覆寫其內容，
+                         呼叫端若要保存觀測值 (例如放入 replay buffer) 必須自行複製。
+        """
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if close.ndim != 1 or features.ndim != 2 or len(close) != len(features):
+            raise ValueError("close 必須為 (T,)，features 必須為 (T, F)，且兩者長度相同。")
+        if np.any(close <= 0):
+            raise ValueError("close 中包含非正數的價格。")
+        if len(close) < window_size + 1:
+            raise ValueError(f"數據長度 {len(close)} 不足以建立 window_size={window_size} 的環境。")
+
+        self.num_envs = num_envs
+        self.window_size = window_size
+        self.initial_cash = initial_cash
+        self.commission = commission
+        self.random_start = random_start
+        self.copy_obs = copy_obs
+        self.num_features = features.shape[1]
+
+        self._close = close
+        self._features = features
+        # 每根 K 線相對前一根的價格變化倍率，對應 Backtester 中 holdings 的 close[i] / close[i-1]
+        self._price_ratio = np.ones_like(close)
+        self._price_ratio[1:] = close[1:] / close[:-1]
+        # (T - W + 1, W, F) 的滑動視窗，僅為原陣列的 view，不複製任何資料
+        self._windows = sliding_window_view(features, window_size, axis=0).transpose(0, 2, 1)
+
+        # 可以作為回合起點的最早與最晚位置 (起點之後至少要能走一步)
+        self._first_start = window_size - 1
+        self._last_index = len(close) - 1
+        self.episode_length = min(episode_length, self._last_index - self._first_start)
+
+        self._rng = np.random.default_rng(seed)
+
+        # 子環境狀態
+        self._t = np.zeros(num_envs, dtype=np.int64)
+        self._steps = np.zeros(num_envs, dtype=np.int64)
+        self._position = np.zeros(num_envs, dtype=np.int8)
+        self._equity = np.full(num_envs, initial_cash, dtype=np.float64)
+        # 觀測值緩衝區，每次 step 重複使用，避免重新配置記憶體
+        self._obs_buf = np.empty((num_envs, window_size, self.num_features), dtype=np.float32)
+        # 視窗內各列相對於視窗起點的偏移量，以及每次 step 重複使用的列索引緩衝區
+        self._window_offsets = np.arange(window_size, dtype=np.int64)
+        self._row_buf = np.empty((num_envs, window_size), dtype=np.int64)
+
+        print(f"交易環境建立完成: {num_envs} 個子環境, {len(close)} 根 K 線, {self.num_features} 個特徵。")
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, feature_columns: list = None, **kwargs) -> 'VectorTradingEnv':
+        """
+        從 `IndicatorCalculator.add_indicators` 產生的 DataFrame 建立環境。
+
+        :param df: 包含 'close' 與指標欄位的 DataFrame。
+        :param feature_columns: 作為觀測特徵的欄位；預設使用 'signal' 以外的所有數值欄位。
+        :return: VectorTradingEnv 實例。
+        """
+        if 'close' not in df.columns:
+            raise ValueError("數據中缺少 'close' 欄位。")
+        if feature_columns is None:
+            feature_columns = [col for col in df.select_dtypes(include='number').columns if col != 'signal']
+        return cls(
+            close=df['close'].to_numpy(dtype=np.float64),
+            features=df[feature_columns].to_numpy(dtype=np.float32),
+            **kwargs
+        )
+
+    def window(self, env_index: int) -> np.ndarray:
+        """回傳單一子環境目前的觀測視窗 (W, F)，為特徵陣列的 view，不複製資料。"""
+        return self._windows[self._t[env_index] - self._first_start]
+
+    def reset(self, seed: int = None):
+        """
+        重置所有子環境。
+
+        :param seed: 若提供，重新設定隨機數種子。
+        :return: (observation, info)
+        """
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._observation(), {}
+
+    def step(self, actions):
+        """
+        所有子環境同時推進一根 K 線。
+
+        在第 t 根 K 線的收盤價依動作調整部位 (扣除手續費)，接著以第 t+1 根 K 線的價格變化更新權益。
+
+        :param actions: 形狀 (N,) 的動作陣列，0 為空手、1 為持有多頭。
+        :return: (observation, reward, terminated, truncated, info)
+        """
+        actions = np.clip(np.asarray(actions), 0, 1).astype(np.int8)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"actions 的形狀必須為 ({self.num_envs},)，收到 {actions.shape}。")
+
+        prev_equity = self._equity.copy()
+
+        # 部位改變即為一次交易，按 Backtester 的方式扣除手續費
+        traded = actions != self._position
+        self._equity[traded] *= (1 - self.commission)
+        self._position = actions
+
+        # 前進一根 K 線，持有多頭時權益跟隨價格變化
+        self._t += 1
+        self._steps += 1
+        ratio = self._price_ratio[self._t]
+        self._equity *= np.where(self._position == 1, ratio, 1.0)
+
+        reward = self._equity / prev_equity - 1.0
+        terminated = self._t >= self._last_index
+        truncated = (self._steps >= self.episode_length) & ~terminated
+
+        info = {
+            'equity': self._equity.copy(),
+            'position': self._position.copy(),
+            'traded': traded,
+        }
+        done = terminated | truncated
+        if done.any():
+            # 自動重置前先保留結束時的觀測值與權益
+            self._observation()
+            info['final_observation'] = {
+                'window': self._obs_buf[done].copy(),
+                'position': self._position[done].copy(),
+            }
+            info['final_equity'] = self._equity[done].copy()
+            info['done_indices'] = np.flatnonzero(done)
+            self._reset_envs(done)
+
+        return self._observation(), reward, terminated, truncated, info
+
+    def _reset_envs(self, mask: np.ndarray):
+        """以新的起點重置 mask 為 True 的子環境。"""
+        count = int(mask.sum())
+        if count == 0:
+            return
+        if self.random_start:
+            last_start = self._last_index - self.episode_length
+            starts = self._rng.integers(self._first_start, last_start + 1, size=count)
+        else:
+            starts = np.full(count, self._first_start, dtype=np.int64)
+        self._t[mask] = starts
+        self._steps[mask] = 0
+        self._position[mask] = 0
+        self._equity[mask] = self.initial_cash
+
+    def _observation(self) -> dict:
+        """將所有子環境的觀測視窗收集到共用緩衝區中；copy_obs 為 True 時回傳其副本。"""
+        # 直接從連續的特徵陣列按列收集；對轉置後的滑動視窗 view 呼叫 np.take 會先複製整個視窗張量
+        np.add((self._t - self._first_start)[:, None], self._window_offsets, out=self._row_buf)
+        np.take(self._features, self._row_buf, axis=0, out=self._obs_buf)
+        return {
+            'window': self._obs_buf.copy() if self.copy_obs else self._obs_buf,
+            'position': self._position.copy(),
+        }
+
+
+class TradingEnv:
+    """
+    單一子環境的交易環境，以純量介面包裝 VectorTradingEnv。
+    觀測視窗直接回傳特徵陣列的 view；回合結束後同樣會自動重置。
+    """
+    def __init__(self, close: np.ndarray, features: np.ndarray, **kwargs):
+        kwargs.pop('num_envs', None)
+        self._env = VectorTradingEnv(close, features, num_envs=1, **kwargs)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, feature_columns: list = None, **kwargs) -> 'TradingEnv':
+        """從包含 'close' 與指標欄位的 DataFrame 建立環境。"""
+        env = cls.__new__(cls)
+        kwargs.pop('num_envs', None)
+        env._env = VectorTradingEnv.from_dataframe(df, feature_columns=feature_columns, num_envs=1, **kwargs)
+        return env
+
+    def reset(self, seed: int = None):
+        """重置環境，回傳 (observation, info)。"""
+        self._env.reset(seed=seed)
+        return self._observation(), {}
+
+    def step(self, action: int):
+        """
+        推進一根 K 線。
+
+        :param action: 0 為空手、1 為持有多頭。
+        :return: (observation, reward, terminated, truncated, info)
+        """
+        _, reward, terminated, truncated, vec_info = self._env.step(np.array([action], dtype=np.int8))
+        info = {
+            'equity': float(vec_info['equity'][0]),
+            'position': int(vec_info['position'][0]),
+            'traded': bool(vec_info['traded'][0]),
+        }
+        if 'final_equity' in vec_info:
+            info['final_equity'] = float(vec_info['final_equity'][0])
+        return self._observation(), float(reward[0]), bool(terminated[0]), bool(truncated[0]), info
+
+    def _observation(self) -> dict:
+        return {
+            'window': self._env.window(0),
+            'position': int(self._env._position[0]),
+        }
+
+
+def benchmark(num_rows: int = 500_000, num_features: int = 12, num_envs: int = 1024,
+              window_size: int = 32, seconds: float = 5.0, seed: int = 0, copy_obs: bool = True) -> float:
+    """
+    以隨機數據量測 VectorTradingEnv 的吞吐量。
+
+    :return: 每分鐘的子環境步數 (steps per minute)。
+    """
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.001, num_rows)))
+    features = rng.normal(size=(num_rows, num_features)).astype(np.float32)
+    env = VectorTradingEnv(close, features, num_envs=num_envs, window_size=window_size, seed=seed,
+                           copy_obs=copy_obs)
+    env.reset()
+
+    actions = np.zeros(num_envs, dtype=np.int8)
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        actions[:] = rng.integers(0, 2, num_envs)
+        env.step(actions)
+        steps += num_envs
+    steps_per_minute = steps / (time.perf_counter() - start) * 60
+
+    print(f"吞吐量: {steps_per_minute / 1e6:,.1f} M steps/min "
+          f"({num_envs} 個子環境, {num_rows} 根 K 線, {num_features} 個特徵, 視窗 {window_size}, "
+          f"copy_obs={copy_obs})。")
+    return steps_per_minute
+
+
+if __name__ == '__main__':
+    benchmark()
+    benchmark(copy_obs=False)
@@ -0,0 +1,329 @@
+# work_queue.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
+from multiprocessing.managers import BaseManager
+from typing import List, Optional
+
+# 任務狀態
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# .env.example 中 OPTIMIZER_AUTHKEY 的預設值，不能作為實際金鑰使用
+AUTHKEY_PLACEHOLDER = 'CHANGE_ME'
+MIN_AUTHKEY_LENGTH = 32
+
+
+def task_id_for(spec: dict) -> str:
+    """
+    以實驗規格的正規化 JSON 計算任務 ID。
+    相同的規格 (資料版本、時間框架、策略、參數) 永遠得到相同的 ID，用於去除重複的工作。
+    """
+    canonical = json.dumps(spec, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def _json_default(value):
+    """讓 numpy 純量 (例如回測摘要中的交易次數) 可以序列化為 JSON。"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class WorkQueue(ABC):
+    """
+    分散式優化器使用的工作佇列抽象介面。
+    協調者 (coordinator) 發布實驗規格，工作者 (worker) 領取任務、執行後回傳結果。
+    - 領取任務時取得有時效的租約 (lease)；工作者失聯導致租約過期後，任務會重新分派。
+    - 失敗的任務會重試，直到達到 max_attempts。
+    - 以規格雜湊作為任務 ID，待執行、執行中或已完成的任務不會重複執行；
+      最終失敗的任務在重新發布時會重置並再次執行。
+    """
+    @abstractmethod
+    def publish(self, specs: List[dict]) -> int:
+        """發布實驗規格，回傳新增或重新發布 (先前最終失敗) 的任務數量。"""
+        pass
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[dict]:
+        """領取一個任務，回傳 {'task_id', 'spec', 'attempts'}；沒有可執行的任務時回傳 None。"""
+        pass
+
+    @abstractmethod
+    def renew(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """延長租約；若任務已不屬於此工作者則回傳 False。"""
+        pass
+
+    @abstractmethod
+    def complete(self, task_id: str, worker_id: str, result: dict):
+        """回報任務完成及其結果。"""
+        pass
+
+    @abstractmethod
+    def fail(self, task_id: str, worker_id: str, error: str):
+        """回報任務失敗；未達重試上限時任務會回到待執行狀態。"""
+        pass
+
+    @abstractmethod
+    def stats(self, task_ids: List[str] = None) -> dict:
+        """回傳各狀態的任務數量。"""
+        pass
+
+    @abstractmethod
+    def results(self, task_ids: List[str] = None) -> List[dict]:
+        """回傳已完成任務的結果列表。"""
+        pass
+
+    @abstractmethod
+    def errors(self, task_ids: List[str] = None) -> List[dict]:
+        """回傳最終失敗任務的規格與錯誤訊息。"""
+        pass
+
+
+class SqliteWorkQueue(WorkQueue):
+    """
+    以 SQLite 檔案實作的工作佇列。
+    適用於同一台機器上的多個工作者程序，或掛載同一個共享目錄的多台機器。
+    每次操作都開啟新的連線，因此可以安全地在多個程序與執行緒之間使用。
+    """
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        """
+        :param db_path: SQLite 資料庫檔案路徑。
+        :param max_attempts: 每個任務最多嘗試的次數。
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    spec TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def publish(self, specs: List[dict]) -> int:
+        now = time.time()
+        rows = [(task_id_for(spec), json.dumps(spec, sort_keys=True), PENDING, now, now) for spec in specs]
+        with closing(self._connect()) as conn:
+            before = conn.total_changes
+            # 已存在的任務只有在最終失敗時才重置為待執行 (例如修正數據版本或節點問題後重新執行)
+            conn.executemany(
+                "INSERT INTO tasks (task_id, spec, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(task_id) DO UPDATE SET status = excluded.status, attempts = 0, error = NULL, "
+                "worker_id = NULL, lease_expires = NULL, updated_at = excluded.updated_at "
+                f"WHERE tasks.status = '{FAILED}'",
+                rows
+            )
+            return conn.total_changes - before
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[dict]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE 取得寫入鎖，確保同一任務不會被兩個工作者同時領取
+            conn.execute("BEGIN IMMEDIATE")
+            # 租約過期且已用完重試次數的任務視為最終失敗
+            conn.execute(
+                "UPDATE tasks SET status = ?, error = COALESCE(error, 'lease expired'), updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, RUNNING, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT task_id, spec, attempts FROM tasks "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY created_at, task_id LIMIT 1",
+                (PENDING, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            task_id, spec, attempts = row
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = ?, lease_expires = ?, attempts = ?, updated_at = ? "
+                "WHERE task_id = ?",
+                (RUNNING, worker_id, now + lease_seconds, attempts + 1, now, task_id)
+            )
+            conn.execute("COMMIT")
+            return {'task_id': task_id, 'spec': json.loads(spec), 'attempts': attempts + 1}
+        except Exception:
+            # BEGIN IMMEDIATE 本身失敗 (例如 database is locked) 時沒有進行中的交易，不能 ROLLBACK
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew(self, task_id: str, worker_id: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE task_id = ? AND worker_id = ? AND status = ?",
+                (now + lease_seconds, now, task_id, worker_id, RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, task_id: str, worker_id: str, result: dict):
+        # 實驗是確定性的，因此即使租約已轉給其他工作者，先完成的結果仍然有效
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = ?, result = ?, error = NULL, updated_at = ? "
+                "WHERE task_id = ? AND status != ?",
+                (DONE, worker_id, json.dumps(result, default=_json_default), time.time(), task_id, DONE)
+            )
+
+    def fail(self, task_id: str, worker_id: str, error: str):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE task_id = ? AND worker_id = ? AND status = ?",
+                (self.max_attempts, FAILED, PENDING, error, time.time(), task_id, worker_id, RUNNING)
+            )
+
+    def stats(self, task_ids: List[str] = None) -> dict:
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for status, _, _ in self._select("status, result, error", task_ids):
+            counts[status] += 1
+        return counts
+
+    def results(self, task_ids: List[str] = None) -> List[dict]:
+        return [json.loads(result) for status, result, _ in self._select("status, result, error", task_ids)
+                if status == DONE]
+
+    def errors(self, task_ids: List[str] = None) -> List[dict]:
+        return [{'spec': json.loads(spec), 'error': error}
+                for status, spec, error in self._select("status, spec, error", task_ids)
+                if status == FAILED]
+
+    def _select(self, columns: str, task_ids: List[str] = None) -> list:
+        """讀取指定任務 (預設為全部) 的欄位。"""
+        with closing(self._connect()) as conn:
+            if task_ids is None:
+                return conn.execute(f"SELECT {columns} FROM tasks").fetchall()
+            wanted = set(task_ids)
+            rows = conn.execute(f"SELECT task_id, {columns} FROM tasks").fetchall()
+            return [row[1:] for row in rows if row[0] in wanted]
+
+
+class _QueueServerManager(BaseManager):
+    """在協調者程序中透過 TCP 提供工作佇列的管理器。"""
+    pass
+
+
+class _QueueClientManager(BaseManager):
+    """工作者用來連線到協調者工作佇列的管理器。"""
+    pass
+
+
+_QueueClientManager.register('get_queue')
+
+
+def serve_work_queue(queue: WorkQueue, address: tuple, authkey: bytes) -> threading.Thread:
+    """
+    在背景執行緒中以 multiprocessing Manager 透過 TCP 提供工作佇列，讓其他機器上的工作者連線。
+
+    :param queue: 實際儲存任務的工作佇列 (通常是 SqliteWorkQueue)。
+    :param address: 監聽位址，例如 ('0.0.0.0', 50000)。
+    :param authkey: 連線驗證金鑰。
+    :return: 執行伺服器的 daemon 執行緒。
+    """
+    _QueueServerManager.register('get_queue', callable=lambda: queue)
+    server = _QueueServerManager(address=address, authkey=authkey).get_server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"工作佇列伺服器已在 {address[0]}:{address[1]} 啟動。")
+    return thread
+
+
+def connect_work_queue(address: tuple, authkey: bytes) -> WorkQueue:
+    """
+    連線到 serve_work_queue 提供的遠端工作佇列，回傳具有相同方法的代理物件。
+    """
+    manager = _QueueClientManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.get_queue()
+
+
+def open_work_queue(url: str, max_attempts: int = 3) -> WorkQueue:
+    """
+    依 URL 建立工作佇列，讓傳輸方式可以抽換。
+    - 'sqlite:///path/to/queue.sqlite': 直接使用 SQLite 檔案。
+    - 'tcp://host:port': 連線到協調者以 serve_work_queue 提供的佇列；
+      驗證金鑰從環境變數 OPTIMIZER_AUTHKEY 讀取。
+    """
+    if url.startswith('sqlite:///'):
+        return SqliteWorkQueue(url[len('sqlite:///'):], max_attempts=max_attempts)
+    if url.startswith('tcp://'):
+        host, port = url[len('tcp://'):].rsplit(':', 1)
+        return connect_work_queue((host, int(port)), get_authkey())
+    raise ValueError(f"不支援的工作佇列 URL: {url}")
+
+
+def get_authkey() -> bytes:
+    """
+    從 .env / 環境變數讀取 TCP 工作佇列的驗證金鑰。
+    TCP 傳輸以 pickle 交換物件，取得金鑰即可在協調者上執行任意程式碼，
+    因此拒絕 .env.example 中的預設值與過短的金鑰。
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    authkey = os.getenv("OPTIMIZER_AUTHKEY")
+    generate_hint = "可用 python -c \"import secrets; print(secrets.token_hex(32))\" 產生。"
+    if not authkey:
+        raise ValueError(f"找不到 OPTIMIZER_AUTHKEY，請在 .env 中設定 TCP 工作佇列的驗證金鑰，{generate_hint}")
+    if authkey == AUTHKEY_PLACEHOLDER:
+        raise ValueError(f"OPTIMIZER_AUTHKEY 仍是 .env.example 中的預設值，請改為隨機金鑰，{generate_hint}")
+    if len(authkey) < MIN_AUTHKEY_LENGTH:
+        raise ValueError(f"OPTIMIZER_AUTHKEY 至少需要 {MIN_AUTHKEY_LENGTH} 個字元，{generate_hint}")
+    return authkey.encode('utf-8')
+
+
+class LeaseKeeper:
+    """
+    工作者執行任務期間，在背景執行緒中定期延長租約，
+    讓長時間的實驗不會被誤判為失聯而重新分派。
+    """
+    def __init__(self, queue: WorkQueue, task_id: str, worker_id: str, lease_seconds: float):
+        self._queue = queue
+        self._task_id = task_id
+        self._worker_id = worker_id
+        self._lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self._lease_seconds / 3):
+            try:
+                if not self._queue.renew(self._task_id, self._worker_id, self._lease_seconds):
+                    return
+            except Exception as e:
+                print(f"延長任務 {self._task_id} 的租約時發生錯誤: {e}")